@@ -4,6 +4,7 @@ Web Scraper with Proxy Rotation (single-file)
 - ProxyManager: manage, probe, rotate, and blacklist proxies
 - CaptchaSolver: adapter for third-party solvers (minimal/stub)
 - Scraper: fetch pages using rotating proxies, UA rotation, retries/backoff, parse & save
+- AsyncScraper: aiohttp-based variant that fetches many URLs concurrently on one event loop
 - Basic parser and CLI to run a URL list and export JSON/CSV
 
 USAGE:
@@ -12,18 +13,56 @@ Or single url:
     python Web_Scraper_with_Proxy_Rotation.py --url "https://httpbin.org/html"
 """
 import argparse
+import asyncio
+import copy
 import random
+import re
 import time
 import json
 import csv
+import gzip
+import hashlib
+import itertools
 import os
+import socket
+import sqlite3
 import threading
 import logging
-from typing import List, Optional, Dict, Any, Callable
+import warnings
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import List, Optional, Dict, Any, Callable, Iterable, Union
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # fall back to lxml for the default title extraction
+    HTMLParser = None
+    import lxml.etree
+    import lxml.html
+    _LXML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+try:
+    import aiohttp
+except ImportError:  # optional: only needed for AsyncScraper
+    aiohttp = None
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON export, stdlib json otherwise
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # optional: faster CSV export, stdlib csv otherwise
+    pa = None
 
 # --------------------------
 # Logging
@@ -37,108 +76,207 @@ logging.basicConfig(
 # --------------------------
 # ProxyManager
 # --------------------------
-class ProxyInfo:
-    def __init__(self, proxy_str: str):
-        self.proxy = proxy_str
-        self.last_checked = 0.0
-        self.successes = 0
-        self.failures = 0
-        self.avg_latency = None
-        self.lock = threading.Lock()
-        self.blacklisted = False
-
-    def score(self) -> float:
-        fails = self.failures + 1
-        latency = self.avg_latency or 5.0
-        return latency * (fails / (self.successes + 1))
+def _host_of(url: str) -> Optional[str]:
+    # proxies may be given without a scheme ("1.2.3.4:8080")
+    try:
+        return urlsplit(url if "://" in url else "//" + url).hostname
+    except ValueError:  # malformed entry: skip it here, fetch() reports it
+        return None
 
 class ProxyManager:
-    def __init__(self, proxies: Optional[List[str]] = None, probe_url: str = "https://httpbin.org/get", timeout: float = 8.0):
-        self._proxies: Dict[str, ProxyInfo] = {}
+    """
+    Proxy pool with health stats stored struct-of-arrays: one NumPy array per stat,
+    indexed by the proxy's slot in self._names, so scoring every proxy is a single
+    vectorized expression instead of a loop over per-proxy objects.
+
+    self._lock only guards structural changes (add/remove/grow) and the selection
+    snapshot. Stat updates from report()/probe_proxy() are deliberately lock-free:
+    the stats are a selection heuristic, so an occasional lost increment or a racy
+    latency average is harmless and not worth serializing every fetch on.
+    """
+
+    def __init__(self, proxies: Optional[List[str]] = None, probe_url: str = "https://httpbin.org/get",
+                 timeout: float = 8.0, probe_workers: int = 32):
+        self._lock = threading.Lock()
+        self._idx: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._latency = np.full(16, np.nan)   # running avg latency, NaN until measured
+        self._succ = np.zeros(16, dtype=np.int64)
+        self._fail = np.zeros(16, dtype=np.int64)
+        self._black = np.zeros(16, dtype=bool)
+        self._checked = np.zeros(16)          # last probe time, 0 = never probed
         self.probe_url = probe_url
         self.timeout = timeout
+        self.probe_workers = probe_workers
+        # one pooled session for all probes instead of a fresh pool + TLS handshake per requests.get
+        self._probe_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0)
+        self._probe_session.mount("https://", adapter)
+        self._probe_session.mount("http://", adapter)
         if proxies:
             for p in proxies:
                 self.add_proxy(p)
 
+    def _grow(self):
+        cap = 2 * len(self._succ)
+        self._latency = np.concatenate([self._latency, np.full(cap - len(self._latency), np.nan)])
+        self._succ = np.resize(self._succ, cap)
+        self._fail = np.resize(self._fail, cap)
+        self._black = np.resize(self._black, cap)
+        self._checked = np.resize(self._checked, cap)
+
     def add_proxy(self, proxy_str: str):
-        if proxy_str in self._proxies:
-            return
-        self._proxies[proxy_str] = ProxyInfo(proxy_str)
+        with self._lock:
+            if proxy_str in self._idx:
+                return
+            i = len(self._names)
+            if i == len(self._succ):
+                self._grow()
+            self._latency[i] = np.nan
+            self._succ[i] = 0
+            self._fail[i] = 0
+            self._black[i] = False
+            self._checked[i] = 0.0
+            self._names.append(proxy_str)
+            self._idx[proxy_str] = i
         logging.debug(f"Added proxy: {proxy_str}")
 
     def remove_proxy(self, proxy_str: str):
-        if proxy_str in self._proxies:
-            del self._proxies[proxy_str]
+        with self._lock:
+            i = self._idx.pop(proxy_str, None)
+            if i is None:
+                return
+            # swap-remove: move the last slot into the freed one
+            last = len(self._names) - 1
+            if i != last:
+                for arr in (self._latency, self._succ, self._fail, self._black, self._checked):
+                    arr[i] = arr[last]
+                moved = self._names[last]
+                self._names[i] = moved
+                self._idx[moved] = i
+            self._names.pop()
 
     def list_proxies(self) -> List[str]:
-        return list(self._proxies.keys())
+        with self._lock:
+            return list(self._names)
+
+    def _record_latency(self, i: int, latency: float):
+        prev = self._latency[i]
+        self._latency[i] = latency if np.isnan(prev) else (prev + latency) / 2.0
 
     def probe_proxy(self, proxy_str: str) -> bool:
-        info = self._proxies.get(proxy_str)
-        if not info:
+        if proxy_str not in self._idx:
             return False
         proxies = {"http": proxy_str, "https": proxy_str}
         t0 = time.time()
         try:
-            r = requests.get(self.probe_url, proxies=proxies, timeout=self.timeout)
+            r = self._probe_session.get(self.probe_url, proxies=proxies, timeout=self.timeout)
             latency = time.time() - t0
-            with info.lock:
-                info.last_checked = time.time()
-                info.successes += 1
-                info.avg_latency = ((info.avg_latency or latency) + latency) / 2.0
-                info.blacklisted = False
+            i = self._idx.get(proxy_str)
+            if i is not None:
+                self._checked[i] = time.time()
+                self._succ[i] += 1
+                self._record_latency(i, latency)
+                self._black[i] = False
             logging.debug(f"Probe ok: {proxy_str} latency={latency:.2f}s")
             return True
         except Exception as e:
-            with info.lock:
-                info.last_checked = time.time()
-                info.failures += 1
-                if info.failures > max(3, info.successes * 3):
-                    info.blacklisted = True
+            i = self._idx.get(proxy_str)
+            if i is not None:
+                self._checked[i] = time.time()
+                self._fail[i] += 1
+                if self._fail[i] > max(3, self._succ[i] * 3):
+                    self._black[i] = True
             logging.debug(f"Probe failed: {proxy_str} ({e})")
             return False
 
-    def bulk_probe(self, timeout_per: float = 0.2):
-        for p in list(self._proxies.keys()):
-            self.probe_proxy(p)
-            time.sleep(timeout_per)
+    def bulk_probe(self, timeout_per: Optional[float] = None):
+        if timeout_per is not None:
+            warnings.warn("bulk_probe(timeout_per=...) is ignored: proxies are now probed concurrently",
+                          DeprecationWarning, stacklevel=2)
+        keys = self.list_proxies()
+        if not keys:
+            return
+        # probes are I/O bound; wall time is bounded by the slowest timeout per batch of workers
+        with ThreadPoolExecutor(max_workers=min(self.probe_workers, len(keys))) as ex:
+            list(ex.map(self.probe_proxy, keys))
 
     def get_proxy(self, allow_blacklisted: bool = False) -> Optional[str]:
-        candidates = [pi for pi in self._proxies.values() if (allow_blacklisted or not pi.blacklisted)]
-        if not candidates:
-            return None
-        unprobed = [c for c in candidates if c.last_checked == 0]
-        if unprobed:
-            chosen = random.choice(unprobed).proxy
-            logging.debug(f"Chose unprobed proxy: {chosen}")
-            return chosen
-        candidates.sort(key=lambda p: p.score())
-        top_n = max(1, min(5, len(candidates)))
-        chosen = random.choice(candidates[:top_n]).proxy
+        with self._lock:
+            n = len(self._names)
+            mask = np.ones(n, dtype=bool) if allow_blacklisted else ~self._black[:n]
+            if not mask.any():
+                return None
+            unprobed = np.flatnonzero(mask & (self._checked[:n] == 0))
+            if unprobed.size:
+                chosen = self._names[int(random.choice(unprobed))]
+                logging.debug(f"Chose unprobed proxy: {chosen}")
+                return chosen
+            latency = np.nan_to_num(self._latency[:n], nan=5.0)
+            scores = latency * (self._fail[:n] + 1.0) / (self._succ[:n] + 1.0)
+            top_n = min(5, int(mask.sum()))
+            if top_n < n:
+                top = np.argpartition(np.where(mask, scores, np.inf), top_n - 1)[:top_n]
+            else:
+                top = np.arange(n)
+            chosen = self._names[int(random.choice(top))]
         logging.debug(f"Chose proxy by score: {chosen}")
         return chosen
 
     def report(self, proxy_str: Optional[str], success: bool, latency: Optional[float] = None):
         if not proxy_str:
             return
-        info = self._proxies.get(proxy_str)
-        if not info:
+        i = self._idx.get(proxy_str)
+        if i is None:
             return
-        with info.lock:
-            if success:
-                info.successes += 1
-                if latency:
-                    info.avg_latency = ((info.avg_latency or latency) + latency) / 2.0
-            else:
-                info.failures += 1
-                if info.failures > 10:
-                    info.blacklisted = True
+        if success:
+            self._succ[i] += 1
+            if latency:
+                self._record_latency(i, latency)
+        else:
+            self._fail[i] += 1
+            if self._fail[i] > 10:
+                self._black[i] = True
+
+    def is_available(self, proxy_str: str) -> bool:
+        i = self._idx.get(proxy_str)
+        return i is not None and not self._black[i]
 
     def blacklist(self, proxy_str: str):
-        info = self._proxies.get(proxy_str)
-        if info:
-            info.blacklisted = True
+        with self._lock:
+            i = self._idx.get(proxy_str)
+            if i is not None:
+                self._black[i] = True
+
+    def warm_dns(self, urls: Iterable[str] = ()) -> int:
+        """
+        Resolve hosts once, in parallel, before scraping so the first request to each host
+        doesn't pay for a cold lookup (effective when the system resolver caches, e.g.
+        systemd-resolved / nscd). With proxies configured only the proxy hosts are resolved:
+        targets are resolved by the proxy, and looking them up locally would leak them to
+        the local resolver. Returns the number of hosts resolved.
+        """
+        proxies = self.list_proxies()
+        hosts = {_host_of(u) for u in (proxies if proxies else list(urls))}
+        hosts.discard(None)
+        if not hosts:
+            return 0
+
+        def resolve(host: str) -> bool:
+            try:
+                socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+                return True
+            except OSError as e:
+                logging.debug(f"DNS lookup failed for {host}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=min(32, len(hosts))) as ex:
+            resolved = sum(ex.map(resolve, hosts))
+        logging.debug(f"Warmed DNS for {resolved}/{len(hosts)} hosts")
+        return resolved
+
+    def close(self):
+        self._probe_session.close()
 
 # --------------------------
 # CaptchaSolver (minimal adapter)
@@ -165,14 +303,155 @@ class CaptchaSolver:
         """
         raise NotImplementedError("Add provider-specific code or instantiate with real implementation.")
 
+# --------------------------
+# Raw page archive
+# --------------------------
+class RawArchive:
+    """
+    Gzip file of raw pages, content-addressed by SHA-1 of the body:
+        URL <url>\nSHA1 <hex>\nLEN <n bytes>\n<body>\n   first occurrence of a body
+        URL <url>\nREF <hex>\n                          body already stored in this run
+    Replaces one file per page; writes are buffered and flushed in batches. The file is
+    created exclusively on first write, so concurrent archives must use distinct paths
+    (see Scraper, which names one per instance).
+    """
+
+    def __init__(self, path: str, flush_bytes: int = 1 << 20, flush_records: int = 100):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_records = flush_records
+        self._file = None
+        self._lock = threading.Lock()  # GzipFile is not thread-safe
+        self._pending_bytes = 0
+        self._pending_records = 0
+        self._seen: set = set()
+
+    def write(self, url: str, html: str) -> bytes:
+        """
+        Store the page and return the SHA-1 digest of its UTF-8 body.
+        """
+        body = html.encode("utf-8")
+        digest = hashlib.sha1(body).digest()
+        hex_digest = digest.hex()
+        with self._lock:
+            if self._file is None:
+                self._file = gzip.GzipFile(self.path, mode="xb", compresslevel=3)
+            if digest in self._seen:
+                record = f"URL {url}\nREF {hex_digest}\n".encode("utf-8")
+            else:
+                self._seen.add(digest)
+                record = f"URL {url}\nSHA1 {hex_digest}\nLEN {len(body)}\n".encode("utf-8") + body + b"\n"
+            self._file.write(record)
+            self._pending_bytes += len(record)
+            self._pending_records += 1
+            if self._pending_bytes >= self.flush_bytes or self._pending_records >= self.flush_records:
+                self._file.flush()
+                self._pending_bytes = 0
+                self._pending_records = 0
+        return digest
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.close()
+
+# --------------------------
+# Fetch ledger
+# --------------------------
+class FetchLedger:
+    """
+    Persistent sqlite record of successfully fetched URLs, so a restarted or repeated run
+    skips URLs fetched within the last `ttl` seconds and returns the stored parsed data.
+    One connection per thread; entries are keyed by canonical URL and parser identity,
+    since the stored data is whatever that parser produced.
+    """
+
+    def __init__(self, path: str, ttl: float = 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS fetched "
+            "(url TEXT, parser TEXT, ts INTEGER, hash BLOB, data TEXT, PRIMARY KEY (url, parser))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def get(self, url: str, parser_id: str = "") -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT data FROM fetched WHERE url = ? AND parser = ? AND ts > ?",
+            (_canonical_url(url), parser_id, int(time.time() - self.ttl)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, url: str, parser_id: str, data: Dict[str, Any], content_hash: bytes):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO fetched (url, parser, ts, hash, data) VALUES (?, ?, ?, ?, ?)",
+            (_canonical_url(url), parser_id, int(time.time()), content_hash,
+             json.dumps(data, ensure_ascii=False, default=str)),
+        )
+
+    def close(self):
+        with self._lock:
+            conns = list(self._conns)
+            self._conns.clear()
+        for conn in conns:
+            conn.close()
+
 # --------------------------
 # Scraper
 # --------------------------
+_archive_seq = itertools.count()
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Safari/605.1.15",
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117 Safari/537.36",
 ]
+_ACCEPT_LANGUAGES = ("en-US,en;q=0.9", "en-GB,en;q=0.9", "en;q=0.8")
+_BASE_HEADERS = {"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
+# transient server errors retried by urllib3 on the kept-alive connection
+_RETRY_STATUSES = frozenset((500, 502, 503, 504))
+
+_CAPTCHA_STATUS = frozenset((403, 429))
+_CAPTCHA_SIGNS = ("captcha", "recaptcha", "hcaptcha", "please verify", "are you human")
+# one case-insensitive pass over the page, no lowercased copy of the HTML
+_CAPTCHA_RE = re.compile("|".join(map(re.escape, _CAPTCHA_SIGNS)), re.IGNORECASE)
+_CAPTCHA_RE_BYTES = re.compile(b"|".join(re.escape(s.encode()) for s in _CAPTCHA_SIGNS), re.IGNORECASE)
+# captcha markers show up early in the page; only this much of the body is scanned
+_CAPTCHA_SCAN_BYTES = 64 * 1024
+
+def _canonical_url(url: str) -> str:
+    # lowercase scheme/host, sort query params, drop fragment and trailing slash
+    try:
+        parts = urlsplit(url)
+    except ValueError:  # malformed (e.g. bad IPv6 host): key on the raw URL, let fetch() report it
+        return url
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+def _parser_id(parser) -> Optional[str]:
+    # stable across runs, unlike the function object itself; "" is the default parser.
+    # None for parsers without a unique importable name (lambdas, closures, partials,
+    # callable instances), which can't be told apart across runs and skip the ledger.
+    if parser is None:
+        return ""
+    qualname = getattr(parser, "__qualname__", None)
+    module = getattr(parser, "__module__", None)
+    if not qualname or not module or "<" in qualname:
+        return None
+    return f"{module}.{qualname}"
 
 class Scraper:
     def __init__(self,
@@ -180,76 +459,541 @@ class Scraper:
                  captcha_solver: Optional[CaptchaSolver] = None,
                  output_dir: str = "data",
                  max_retries: int = 5,
-                 rate_limit: float = 0.5):
+                 rate_limit: float = 0.5,
+                 backoff_base: float = 1.0,
+                 backoff_cap: float = 30.0,
+                 cache_size: int = 10000,
+                 ledger: Optional[FetchLedger] = None,
+                 per_host_limit: int = 5):
+        if per_host_limit < 1:
+            raise ValueError(f"per_host_limit must be >= 1, got {per_host_limit}")
         self.proxy_manager = proxy_manager or ProxyManager([])
         self.captcha_solver = captcha_solver
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        # one archive per instance: concurrent appends to a shared gzip file corrupt it
+        archive = f"raw_pages_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}_{next(_archive_seq)}.gz"
+        self._raw_writer = RawArchive(os.path.join(self.output_dir, archive))
         self.max_retries = max_retries
         self.rate_limit = rate_limit
-        self.session = requests.Session()
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # direct requests only, status retries only: connect/read errors are left to fetch();
+        # proxied sessions get no adapter retries so fetch() rotates the proxy instead
+        self._retry = Retry(total=None, connect=0, read=0, other=0, status=max_retries,
+                            backoff_factor=backoff_base, status_forcelist=_RETRY_STATUSES,
+                            allowed_methods=frozenset(["GET"]),
+                            respect_retry_after_header=True, raise_on_status=False)
+        self.session = self._new_session(self._retry)
+        # per-proxy sessions keep connections alive when the proxy changes between requests
+        self._sessions: Dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+        # LRU of successful results keyed by (canonical url, parser), skips duplicate URLs in a run
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # futures of fetches in progress, so duplicates submitted together share one request
+        self._inflight: Dict[Any, Any] = {}
+        self.ledger = ledger
+        # caps concurrent requests per origin so parallel workers don't trip rate limits/captchas
+        self.per_host_limit = per_host_limit
+        self._host_sems: Dict[str, Any] = {}
+        self._host_sems_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for s in sessions:
+            s.close()
+        self.session.close()
+        self._raw_writer.close()
+
+    def _new_session(self, retry: Union[Retry, int] = 0) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=32, pool_maxsize=64)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _session_for(self, proxy: Optional[str]) -> requests.Session:
+        if not proxy:
+            return self.session
+        stale: List[requests.Session] = []
+        with self._sessions_lock:
+            session = self._sessions.get(proxy)
+            if session is None:
+                # sessions of removed/blacklisted proxies are closed as the pool changes
+                for p in [p for p in self._sessions if not self.proxy_manager.is_available(p)]:
+                    stale.append(self._sessions.pop(p))
+                session = self._new_session()
+                # one cookie jar across proxy switches, as with a single session
+                session.cookies = self.session.cookies
+                self._sessions[proxy] = session
+        for s in stale:
+            s.close()
+        return session
+
+    def _drop_session(self, proxy: str):
+        with self._sessions_lock:
+            session = self._sessions.pop(proxy, None)
+        if session is not None:
+            session.close()
+
+    def _cache_get(self, url: str, parser) -> Optional[Dict[str, Any]]:
+        key = (_canonical_url(url), parser)
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is None:
+                return None
+            self._cache.move_to_end(key)
+        logging.debug(f"Cache hit: {url}")
+        return dict(copy.deepcopy(result), url=url)
+
+    def _cache_put(self, url: str, parser, result: Dict[str, Any]):
+        if self.cache_size <= 0:
+            return
+        key = (_canonical_url(url), parser)
+        result = copy.deepcopy(result)  # the caller keeps (and may mutate) the original
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _new_inflight(self):
+        return Future()
+
+    def _claim(self, url: str, parser):
+        """
+        Return (key, future, owner): owner is True if the caller must do the fetch and
+        publish it via _release; otherwise the future belongs to a fetch already running.
+        """
+        key = (_canonical_url(url), parser)
+        with self._cache_lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return key, fut, False
+            fut = self._inflight[key] = self._new_inflight()
+            return key, fut, True
+
+    def _release(self, key, fut, result: Optional[Dict[str, Any]]):
+        with self._cache_lock:
+            self._inflight.pop(key, None)
+        if result is None:
+            fut.cancel()  # owner raised; waiters see the cancellation
+        else:
+            fut.set_result(copy.deepcopy(result))  # the owner returns result itself
+
+    def _new_host_sem(self):
+        return threading.BoundedSemaphore(self.per_host_limit)
+
+    def _host_sem(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        with self._host_sems_lock:
+            sem = self._host_sems.get(host)
+            if sem is None:
+                sem = self._new_host_sem()
+                self._host_sems[host] = sem
+            return sem
+
+    def _lookup(self, url: str, parser) -> Optional[Dict[str, Any]]:
+        cached = self._cache_get(url, parser)
+        parser_id = _parser_id(parser)
+        if cached is None and self.ledger is not None and parser_id is not None:
+            try:
+                data = self.ledger.get(url, parser_id)
+            except sqlite3.Error as e:
+                logging.warning(f"Ledger lookup failed for {url}: {e}")
+                data = None
+            if data is not None:
+                logging.debug(f"Ledger hit: {url}")
+                cached = {"url": url, "status": "ok", "data": data, "proxy": None}
+        return cached
+
+    def _remember(self, url: str, parser, result: Dict[str, Any], content_hash: bytes):
+        self._cache_put(url, parser, result)
+        parser_id = _parser_id(parser)
+        if self.ledger is not None and parser_id is not None:
+            try:
+                self.ledger.put(url, parser_id, result["data"], content_hash)
+            except sqlite3.Error as e:
+                # the fetch itself succeeded; don't turn a bookkeeping failure into a retry
+                logging.warning(f"Ledger write failed for {url}: {e}")
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # "full jitter": spread retries uniformly so concurrent scrapers don't retry in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _is_unrecoverable(self, exc: Exception, proxy: Optional[str] = None) -> bool:
+        # 4xx responses other than timeout / rate limiting won't change on retry
+        if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+            status = exc.response.status_code
+            if status in _RETRY_STATUSES and proxy is None:
+                # already retried by the direct session's Retry adapter, no proxy to rotate;
+                # proxied sessions don't retry, a 5xx there may come from the proxy itself
+                return True
+        elif aiohttp is not None and isinstance(exc, aiohttp.ClientResponseError):
+            status = exc.status
+        else:
+            return False
+        return 400 <= status < 500 and status not in (408, 429)
 
     def _make_headers(self) -> Dict[str, str]:
-        ua = random.choice(USER_AGENTS)
-        headers = {
-            "User-Agent": ua,
-            "Accept-Language": random.choice(["en-US,en;q=0.9", "en-GB,en;q=0.9", "en;q=0.8"]),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-        }
+        # one RNG call picks both: low byte -> UA, high byte -> Accept-Language.
+        # USER_AGENTS is indexed live (not snapshotted) so entries users append are used
+        r = random.getrandbits(16)
+        headers = _BASE_HEADERS.copy()
+        headers["User-Agent"] = USER_AGENTS[(r & 0xFF) % len(USER_AGENTS)]
+        headers["Accept-Language"] = _ACCEPT_LANGUAGES[(r >> 8) % len(_ACCEPT_LANGUAGES)]
         return headers
 
-    def _detect_captcha(self, text: str, status_code: int) -> bool:
-        if status_code in (403, 429):
+    def _detect_captcha(self, text: Union[str, bytes], status_code: int) -> bool:
+        if status_code in _CAPTCHA_STATUS:
             return True
-        lowered = text.lower()
-        signs = ["captcha", "recaptcha", "hcaptcha", "please verify", "are you human"]
-        return any(s in lowered for s in signs)
+        pattern = _CAPTCHA_RE_BYTES if isinstance(text, bytes) else _CAPTCHA_RE
+        return pattern.search(text) is not None
 
-    def _save_raw(self, url: str, html: str):
-        safe = url.replace("://", "_").replace("/", "_")[:240]
-        fname = os.path.join(self.output_dir, f"raw_{safe}.html")
-        with open(fname, "w", encoding="utf-8") as f:
-            f.write(html)
+    @staticmethod
+    def _decode(body: bytes, encoding: Optional[str]) -> str:
+        # header charset (as r.text would use), without chardet guessing over the whole body
+        try:
+            return body.decode(encoding or "utf-8", errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
+
+    def _save_raw(self, url: str, html: str) -> bytes:
+        return self._raw_writer.write(url, html)
 
     def _default_parse(self, html: str) -> Dict[str, Any]:
-        soup = BeautifulSoup(html, "lxml")
-        title = soup.title.string.strip() if soup.title and soup.title.string else ""
+        # only <title> is needed, so avoid materializing a full BeautifulSoup tree
+        title = ""
+        if HTMLParser is not None:
+            node = HTMLParser(html).css_first("title")
+            title = node.text(strip=True) if node is not None else ""
+        elif html.strip():
+            try:
+                doc = lxml.html.document_fromstring(html.encode("utf-8"), parser=_LXML_PARSER)
+                title = (doc.findtext(".//title") or "").strip()
+            except lxml.etree.ParserError:
+                pass  # no elements at all (e.g. comment-only page): no title, not a failed fetch
         return {"title": title, "length": len(html)}
 
     def fetch(self, url: str, parser: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        cached = self._lookup(url, parser)
+        if cached is not None:
+            return cached
+        key, fut, owner = self._claim(url, parser)
+        if not owner:
+            return dict(copy.deepcopy(fut.result()), url=url)
+        result = None
+        try:
+            result = self._fetch(url, parser)
+        finally:
+            self._release(key, fut, result)
+        return result
+
+    def _fetch(self, url: str, parser: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
         last_exc = None
         for attempt in range(self.max_retries):
             proxy = self.proxy_manager.get_proxy()
             proxies = {"http": proxy, "https": proxy} if proxy else None
             headers = self._make_headers()
             try:
-                t0 = time.time()
-                r = self.session.get(url, headers=headers, proxies=proxies, timeout=15)
-                latency = time.time() - t0
-                success = (r.status_code == 200)
-                self.proxy_manager.report(proxy, success, latency) if proxy else None
-
-                if self._detect_captcha(r.text, r.status_code):
-                    logging.warning(f"Detected captcha/block at {url} (status={r.status_code}) using proxy={proxy}")
-                    self.proxy_manager.report(proxy, False, latency)
-                    # option: try captcha solver when available (not implemented fully here)
-                    raise Exception("CAPTCHA or block detected")
-
-                r.raise_for_status()
-                parsed = parser(r.text) if parser else self._default_parse(r.text)
-                self._save_raw(url, r.text)
+                # the slot covers session.get; for direct (unproxied) requests that includes the
+                # adapter's 5xx retries and any Retry-After sleep. Proxied sessions don't retry,
+                # and fetch()'s own backoff below runs without holding the slot
+                with self._host_sem(url):
+                    t0 = time.time()
+                    r = self._session_for(proxy).get(url, headers=headers, proxies=proxies, timeout=15, stream=True)
+                    try:
+                        latency = time.time() - t0
+                        success = (r.status_code == 200)
+                        self.proxy_manager.report(proxy, success, latency) if proxy else None
+
+                        head = r.raw.read(_CAPTCHA_SCAN_BYTES, decode_content=True)
+                        if self._detect_captcha(head, r.status_code):
+                            logging.warning(f"Detected captcha/block at {url} (status={r.status_code}) using proxy={proxy}")
+                            self.proxy_manager.report(proxy, False, latency)
+                            # option: try captcha solver when available (not implemented fully here)
+                            raise Exception("CAPTCHA or block detected")
+
+                        r.raise_for_status()
+                        text = self._decode(head + r.raw.read(decode_content=True), r.encoding)
+                    finally:
+                        r.close()
+                parsed = parser(text) if parser else self._default_parse(text)
+                content_hash = self._save_raw(url, text)
                 # polite pause
                 time.sleep(self.rate_limit + random.random() * 0.5)
-                return {"url": url, "status": "ok", "data": parsed, "proxy": proxy}
+                result = {"url": url, "status": "ok", "data": parsed, "proxy": proxy}
             except Exception as e:
                 last_exc = e
+                if self._is_unrecoverable(e, proxy):
+                    logging.error(f"Giving up on {url}: {e}")
+                    return {"url": url, "status": "failed", "error": str(e)}
                 logging.debug(f"Fetch attempt {attempt+1} failed for {url} with proxy={proxy}: {e}")
-                # exponential backoff + jitter
-                sleep_for = (2 ** attempt) + random.random()
-                time.sleep(sleep_for)
+                time.sleep(self._backoff_delay(attempt))
                 if proxy:
                     self.proxy_manager.report(proxy, False)
+                    if not self.proxy_manager.is_available(proxy):
+                        self._drop_session(proxy)
                 continue
+            # outside the try: a ledger/cache problem must not trigger a re-download
+            self._remember(url, parser, result, content_hash)
+            return result
         logging.error(f"Failed to fetch {url} after {self.max_retries} attempts: {last_exc}")
         return {"url": url, "status": "failed", "error": str(last_exc)}
-...
+
+# --------------------------
+# AsyncScraper (aiohttp)
+# --------------------------
+class AsyncScraper(Scraper):
+    """
+    aiohttp-based scraper: overlaps network waits for many URLs on a single event loop.
+    Reuses the header rotation, captcha detection, parsing and saving of Scraper.
+    """
+
+    def __init__(self, *args, concurrency: int = 50, **kwargs):
+        if aiohttp is None:
+            raise RuntimeError("AsyncScraper requires aiohttp (pip install aiohttp)")
+        super().__init__(*args, **kwargs)
+        self.concurrency = concurrency
+        self._session = None
+
+    def _get_session(self):
+        # ClientSession must be created inside the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=10, ttl_dns_cache=3600)
+            )
+        return self._session
+
+    def _new_host_sem(self):
+        return asyncio.Semaphore(self.per_host_limit)
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        # asyncio semaphores are bound to the loop that used them
+        with self._host_sems_lock:
+            self._host_sems.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+        self.close()
+
+    def _new_inflight(self):
+        return asyncio.get_running_loop().create_future()
+
+    async def fetch(self, url: str, parser: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        cached = self._lookup(url, parser)
+        if cached is not None:
+            return cached
+        key, fut, owner = self._claim(url, parser)
+        if not owner:
+            return dict(copy.deepcopy(await fut), url=url)
+        result = None
+        try:
+            result = await self._fetch(url, parser)
+        finally:
+            self._release(key, fut, result)
+        return result
+
+    async def _fetch(self, url: str, parser: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        session = self._get_session()
+        last_exc = None
+        for attempt in range(self.max_retries):
+            proxy = self.proxy_manager.get_proxy()
+            headers = self._make_headers()
+            try:
+                async with self._host_sem(url):
+                    t0 = time.time()
+                    async with session.get(url, headers=headers, proxy=proxy,
+                                           timeout=aiohttp.ClientTimeout(total=15)) as r:
+                        text = await r.text(errors="replace")
+                        latency = time.time() - t0
+                        success = (r.status == 200)
+                        self.proxy_manager.report(proxy, success, latency) if proxy else None
+
+                        if self._detect_captcha(text, r.status):
+                            logging.warning(f"Detected captcha/block at {url} (status={r.status}) using proxy={proxy}")
+                            self.proxy_manager.report(proxy, False, latency)
+                            raise Exception("CAPTCHA or block detected")
+
+                        r.raise_for_status()
+                parsed = parser(text) if parser else self._default_parse(text)
+                content_hash = self._save_raw(url, text)
+                # polite pause
+                await asyncio.sleep(self.rate_limit + random.random() * 0.5)
+                result = {"url": url, "status": "ok", "data": parsed, "proxy": proxy}
+            except Exception as e:
+                last_exc = e
+                if self._is_unrecoverable(e):
+                    logging.error(f"Giving up on {url}: {e}")
+                    return {"url": url, "status": "failed", "error": str(e)}
+                logging.debug(f"Fetch attempt {attempt+1} failed for {url} with proxy={proxy}: {e}")
+                await asyncio.sleep(self._backoff_delay(attempt))
+                if proxy:
+                    self.proxy_manager.report(proxy, False)
+                continue
+            # outside the try: a ledger/cache problem must not trigger a re-download
+            self._remember(url, parser, result, content_hash)
+            return result
+        logging.error(f"Failed to fetch {url} after {self.max_retries} attempts: {last_exc}")
+        return {"url": url, "status": "failed", "error": str(last_exc)}
+
+    async def _bounded_fetch(self, url: str, sem: asyncio.Semaphore,
+                             parser: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        async with sem:
+            return await self.fetch(url, parser)
+
+    async def fetch_many(self, urls: List[str],
+                         parser: Optional[Callable[[str], Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        sem = asyncio.Semaphore(self.concurrency)
+        try:
+            return await asyncio.gather(*(self._bounded_fetch(u, sem, parser) for u in urls))
+        finally:
+            await self.aclose()
+
+    def run(self, urls: List[str], parser: Optional[Callable[[str], Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Synchronous entry point (e.g. for the CLI): fetch all URLs concurrently and return results in order.
+        """
+        return asyncio.run(self.fetch_many(urls, parser))
+
+# --------------------------
+# Output & CLI
+# --------------------------
+def load_lines(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def save_json(results: List[Dict[str, Any]], path: str):
+    if orjson is not None:
+        try:
+            data = orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+                                | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            pass  # e.g. ints beyond 64 bits from a custom parser, which json accepts
+        else:
+            with open(path, "wb") as f:
+                f.write(data)
+            return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+def _flatten(result: Dict[str, Any]) -> Dict[str, Any]:
+    row = {k: v for k, v in result.items() if k != "data"}
+    row.update(result.get("data") or {})
+    return row
+
+def save_csv(results: List[Dict[str, Any]], path: str):
+    rows = [_flatten(r) for r in results]
+    fieldnames: List[str] = []
+    for row in rows:
+        fieldnames.extend(k for k in row if k not in fieldnames)
+    if pa is not None:
+        try:
+            table = pa.table({k: [row.get(k) for row in rows] for k in fieldnames})
+            # match the csv fallback byte for byte: header written by csv (Arrow always quotes
+            # it), data unquoted; values that need quoting raise ArrowInvalid and go through csv
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f, lineterminator="\n").writerow(fieldnames)
+            with open(path, "ab") as f:
+                pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(
+                    include_header=False, quoting_style="none"))
+            return
+        except (pa.ArrowException, OverflowError, TypeError):
+            pass  # e.g. mixed-type columns, ints over 64 bits, non-str keys from a custom parser
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+def _positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {n}")
+    return n
+
+def main():
+    ap = argparse.ArgumentParser(description="Web scraper with proxy rotation")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--url", help="single URL to fetch")
+    src.add_argument("--urls", help="file with one URL per line")
+    ap.add_argument("--proxies", help="file with one proxy per line")
+    ap.add_argument("--probe", action="store_true", help="probe all proxies before scraping")
+    ap.add_argument("--warm-dns", action="store_true",
+                    help="pre-resolve proxy hosts (or target hosts when no proxies are given)")
+    ap.add_argument("--output-dir", default="data")
+    ap.add_argument("--output-json")
+    ap.add_argument("--output-csv")
+    ap.add_argument("--max-retries", type=int, default=5)
+    ap.add_argument("--rate-limit", type=float, default=0.5)
+    ap.add_argument("--ledger", help="sqlite file recording fetched URLs; skips them on later runs")
+    ap.add_argument("--ledger-ttl", type=float, default=24.0, help="hours a ledger entry stays valid")
+    ap.add_argument("--workers", type=int, default=16, help="concurrent fetches")
+    ap.add_argument("--per-host", type=_positive_int, default=5, help="max concurrent fetches per host")
+    ap.add_argument("--async", dest="use_async", action="store_true", help="use the aiohttp-based AsyncScraper")
+    ap.add_argument("--uvloop", action="store_true", help="run --async on uvloop (not available on Windows)")
+    args = ap.parse_args()
+
+    urls = [args.url] if args.url else load_lines(args.urls)
+    proxy_manager = ProxyManager(load_lines(args.proxies) if args.proxies else [])
+    if args.warm_dns:
+        proxy_manager.warm_dns(urls)
+    if args.probe:
+        proxy_manager.bulk_probe()
+
+    ledger = FetchLedger(args.ledger, ttl=args.ledger_ttl * 3600) if args.ledger else None
+    kwargs = dict(proxy_manager=proxy_manager, output_dir=args.output_dir,
+                  max_retries=args.max_retries, rate_limit=args.rate_limit, ledger=ledger,
+                  per_host_limit=args.per_host)
+    started = time.time()
+    try:
+        if args.use_async:
+            if args.uvloop:
+                try:
+                    import uvloop
+                    uvloop.install()
+                except ImportError:
+                    logging.warning("uvloop not installed; using the default asyncio event loop")
+            scraper = AsyncScraper(concurrency=args.workers, **kwargs)
+            try:
+                results = scraper.run(urls)
+            finally:
+                scraper.close()
+        else:
+            # keep input order, matching the async path
+            results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+            with Scraper(**kwargs) as scraper, ThreadPoolExecutor(max_workers=args.workers) as ex:
+                futures = {ex.submit(scraper.fetch, u): i for i, u in enumerate(urls)}
+                for fut in as_completed(futures):
+                    results[futures[fut]] = fut.result()
+    finally:
+        proxy_manager.close()
+        if ledger is not None:
+            ledger.close()
+
+    ok = sum(1 for r in results if r["status"] == "ok")
+    logging.info(f"Fetched {ok}/{len(results)} URLs in {time.time() - started:.1f}s")
+    if args.output_json:
+        save_json(results, args.output_json)
+    if args.output_csv:
+        save_csv(results, args.output_csv)
+    if not (args.output_json or args.output_csv):
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
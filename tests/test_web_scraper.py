@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ws = pytest.importorskip("Web_Scraper_with_Proxy_Rotation")
+
+
+@pytest.fixture
+def scraper(tmp_path):
+    s = ws.Scraper(output_dir=str(tmp_path), cache_size=2)
+    yield s
+    s.close()
+
+
+def _ok(url, title="t"):
+    return {"url": url, "status": "ok", "data": {"title": title, "links": ["a"]}, "proxy": None}
+
+
+# --- LRU cache -------------------------------------------------------------
+
+def test_cache_evicts_least_recently_used(scraper):
+    scraper._cache_put("http://a.test/", None, _ok("http://a.test/"))
+    scraper._cache_put("http://b.test/", None, _ok("http://b.test/"))
+    assert scraper._cache_get("http://a.test/", None) is not None  # a is now most recent
+    scraper._cache_put("http://c.test/", None, _ok("http://c.test/"))
+    assert scraper._cache_get("http://b.test/", None) is None
+    assert scraper._cache_get("http://a.test/", None) is not None
+    assert scraper._cache_get("http://c.test/", None) is not None
+
+
+def test_cache_matches_canonical_url_and_keeps_callers_url(scraper):
+    scraper._cache_put("http://A.test/p?b=2&a=1#frag", None, _ok("http://A.test/p?b=2&a=1#frag"))
+    hit = scraper._cache_get("http://a.test/p?a=1&b=2", None)
+    assert hit is not None
+    assert hit["url"] == "http://a.test/p?a=1&b=2"
+
+
+def test_cache_keys_on_parser(scraper):
+    scraper._cache_put("http://a.test/", None, _ok("http://a.test/"))
+    assert scraper._cache_get("http://a.test/", len) is None
+
+
+def test_cache_isolated_from_caller_mutation(scraper):
+    result = _ok("http://a.test/")
+    scraper._cache_put("http://a.test/", None, result)
+    result["data"]["title"] = "changed"
+    hit = scraper._cache_get("http://a.test/", None)
+    assert hit["data"]["title"] == "t"
+    hit["data"]["links"].append("b")
+    assert scraper._cache_get("http://a.test/", None)["data"]["links"] == ["a"]
+
+
+def test_cache_disabled(tmp_path):
+    s = ws.Scraper(output_dir=str(tmp_path), cache_size=0)
+    try:
+        s._cache_put("http://a.test/", None, _ok("http://a.test/"))
+        assert s._cache_get("http://a.test/", None) is None
+    finally:
+        s.close()
+
+
+# --- in-flight dedupe ------------------------------------------------------
+
+def test_claim_and_release(scraper):
+    key, fut, owner = scraper._claim("http://a.test/?x=1", None)
+    key2, fut2, owner2 = scraper._claim("http://A.test/?x=1", None)
+    assert owner and not owner2
+    assert key == key2 and fut is fut2
+    result = _ok("http://a.test/?x=1")
+    scraper._release(key, fut, result)
+    assert key not in scraper._inflight
+    assert fut.result() == result and fut.result() is not result
+    assert scraper._claim("http://a.test/?x=1", None)[2]  # next fetch owns a fresh future
+
+
+def test_release_without_result_cancels_waiters(scraper):
+    key, fut, _ = scraper._claim("http://a.test/", None)
+    scraper._release(key, fut, None)
+    assert fut.cancelled()
+    assert key not in scraper._inflight
+
+
+def test_concurrent_duplicates_share_one_fetch(scraper, monkeypatch):
+    calls = []
+    started = threading.Event()
+
+    def fake_fetch(url, parser=None):
+        calls.append(url)
+        started.set()
+        time.sleep(0.2)  # hold the claim while the duplicates arrive
+        return _ok(url)
+
+    monkeypatch.setattr(scraper, "_fetch", fake_fetch)
+    urls = ["http://a.test/p?a=1&b=2", "http://a.test/p?b=2&a=1"] * 4
+    with ThreadPoolExecutor(max_workers=len(urls)) as ex:
+        results = list(ex.map(scraper.fetch, urls))
+    assert len(calls) == 1
+    assert [r["url"] for r in results] == urls
+    assert len({id(r) for r in results}) == len(results)
+    results[0]["data"]["links"].append("x")
+    assert all(r["data"]["links"] == ["a"] for r in results[1:])
+
+
+def test_failed_fetch_propagates_to_waiters(scraper, monkeypatch):
+    def boom(url, parser=None):
+        time.sleep(0.2)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(scraper, "_fetch", boom)
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        futs = [ex.submit(scraper.fetch, "http://a.test/") for _ in range(4)]
+    errors = [f.exception() for f in futs]
+    assert all(e is not None for e in errors)
+    assert not scraper._inflight
+
+
+# --- ProxyManager struct-of-arrays -----------------------------------------
+
+def _proxies(n):
+    return [f"http://10.0.0.{i}:8080" for i in range(n)]
+
+
+def _assert_consistent(pm):
+    assert len(pm._idx) == len(pm._names)
+    for name, i in pm._idx.items():
+        assert pm._names[i] == name
+
+
+def test_add_grows_past_initial_capacity():
+    pm = ws.ProxyManager(_proxies(16))
+    try:
+        pm.report(pm._names[3], True, latency=0.5)
+        pm.add_proxy("http://10.0.1.1:8080")
+        assert len(pm._succ) == 32
+        assert all(len(a) == 32 for a in (pm._latency, pm._fail, pm._black, pm._checked))
+        assert pm._succ[3] == 1 and pm._latency[3] == 0.5
+        assert pm._idx["http://10.0.1.1:8080"] == 16
+        _assert_consistent(pm)
+    finally:
+        pm.close()
+
+
+def test_add_ignores_duplicates():
+    pm = ws.ProxyManager(_proxies(2) * 2)
+    try:
+        assert pm.list_proxies() == _proxies(2)
+    finally:
+        pm.close()
+
+
+def test_remove_swaps_last_slot_with_its_stats():
+    names = _proxies(4)
+    pm = ws.ProxyManager(names)
+    try:
+        pm.report(names[3], True, latency=0.25)
+        pm.report(names[3], False)
+        pm.remove_proxy(names[1])
+        assert pm._idx[names[3]] == 1
+        assert pm._succ[1] == 1 and pm._fail[1] == 1 and pm._latency[1] == 0.25
+        assert names[1] not in pm.list_proxies()
+        _assert_consistent(pm)
+        pm.remove_proxy(names[3])  # now the last slot: plain pop
+        pm.remove_proxy("http://missing:1")
+        assert pm.list_proxies() == [names[0], names[2]]
+        _assert_consistent(pm)
+        pm.add_proxy(names[1])  # reused slot starts with fresh stats
+        i = pm._idx[names[1]]
+        assert pm._succ[i] == 0 and pm._fail[i] == 0 and not pm._black[i]
+    finally:
+        pm.close()
+
+
+def test_get_proxy_skips_blacklisted():
+    names = _proxies(8)
+    pm = ws.ProxyManager(names)
+    try:
+        for name in names[:-1]:
+            pm.blacklist(name)
+        assert {pm.get_proxy() for _ in range(20)} == {names[-1]}
+        pm.blacklist(names[-1])
+        assert pm.get_proxy() is None
+        assert pm.get_proxy(allow_blacklisted=True) in names
+    finally:
+        pm.close()
+
+
+def test_get_proxy_prefers_unprobed_then_best_scored():
+    names = _proxies(8)
+    pm = ws.ProxyManager(names)
+    try:
+        for i, name in enumerate(names[1:], 1):
+            pm._checked[pm._idx[name]] = time.time()
+            pm.report(name, True, latency=float(i))
+        assert pm.get_proxy() == names[0]
+        pm._checked[pm._idx[names[0]]] = time.time()
+        pm.report(names[0], True, latency=100.0)
+        top5 = set(names[1:6])
+        assert {pm.get_proxy() for _ in range(50)} <= top5
+    finally:
+        pm.close()